@@ -1,3 +1,12 @@
+import functools
+import io
+import os
+import queue
+import re
+import stat
+import threading
+
+
 class TextReader:
     def __init__(self, stream):
         self.stream = stream
@@ -27,7 +36,122 @@ class TextReader:
         self.stream.close()
 
 
+_line_pattern = re.compile(r'[^\r\n]*(?:\r\n?|\n)|[^\r\n]+')
+
+
+class ListReader:
+    def __init__(self, text):
+        self.lines = _line_pattern.findall(text)
+        self.line_number = 0
+
+        self._index = 0
+
+    def readline(self):
+        if self._index >= len(self.lines):
+            return ''
+
+        line = self.lines[self._index]
+        self._index += 1
+        self.line_number += 1
+
+        return line
+
+    def peekline(self):
+        if self._index >= len(self.lines):
+            return ''
+
+        return self.lines[self._index]
+
+    def close(self):
+        self.lines = []
+
+
+_max_in_memory_size = 128 << 20
+
+
+def _fits_in_memory(stream):
+    try:
+        st = os.fstat(stream.fileno())
+    except (AttributeError, OSError):
+        return False
+
+    return stat.S_ISREG(st.st_mode) and st.st_size <= _max_in_memory_size
+
+
+def create_reader(stream, encoding='utf-8'):
+    if isinstance(stream, str):
+        return ListReader(stream)
+
+    if _fits_in_memory(stream):
+        data = stream.read()
+
+        if isinstance(data, bytes):
+            data = data.decode(encoding)
+
+        return ListReader(data)
+
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        stream = io.TextIOWrapper(stream, encoding=encoding, newline='')
+
+    return TextReader(stream)
+
+
+BUFFER_SIZE = 1 << 20
+
+
+def _open_input_file(pathname):
+    stream = open(pathname, 'rb', buffering=BUFFER_SIZE)
+
+    if not _fits_in_memory(stream):
+        return stream
+
+    with stream:
+        return stream.read().decode('utf-8')
+
+
+def _prefetch_input_files(pathnames, results):
+    try:
+        for pathname in pathnames:
+            try:
+                source = _open_input_file(pathname)
+            except (OSError, ValueError) as exc:
+                results.put((pathname, None, exc))
+            else:
+                results.put((pathname, source, None))
+    except BaseException as exc:
+        results.put(exc)
+    finally:
+        results.put(None)
+
+
+def prefetch_input_files(pathnames, max_pending=1):
+    results = queue.Queue(max_pending)
+    thread = threading.Thread(target=_prefetch_input_files, args=(pathnames, results), daemon=True)
+    thread.start()
+
+    while True:
+        item = results.get()
+
+        if item is None:
+            break
+
+        if isinstance(item, BaseException):
+            raise item
+
+        _, source, _ = item
+
+        try:
+            yield item
+        finally:
+            if isinstance(source, io.IOBase):
+                source.close()
+
+    thread.join()
+
+
 class LineSpan:
+    __slots__ = ('start', 'end')
+
     def __init__(self):
         self.start = 1
         self.end = 1
@@ -37,12 +161,13 @@ class LineSpan:
 
 
 class VCardProperty:
-    __line_span__ = None
+    __slots__ = ('name', 'parameters', 'value', '__line_span__')
 
     def __init__(self, name='', value=''):
         self.name = name
         self.parameters = {}
         self.value = value
+        self.__line_span__ = None
 
     def add_parameter(self, name, value):
         self.parameters.setdefault(name, [])
@@ -56,10 +181,11 @@ class VCardProperty:
 
 
 class VCard:
-    __line_span__ = None
+    __slots__ = ('properties', '__line_span__')
 
     def __init__(self):
         self.properties = {}
+        self.__line_span__ = None
 
     def add_property(self, prop):
         self.properties.setdefault(prop.name, [])
@@ -70,17 +196,21 @@ class VCard:
         self.properties.pop(name, None)
 
 
+@functools.lru_cache(maxsize=None)
+def _build_any_pattern(chars):
+    return re.compile(f'[{re.escape(chars)}]')
+
+
 def _index_any(string, chars, start=0):
-    index = start
-    stop = len(string)
+    match = _build_any_pattern(chars).search(string, start)
+
+    if not match:
+        raise ValueError('Not found any expected char')
 
-    while index < stop:
-        if string[index] in chars:
-            return index
+    return match.start()
 
-        index += 1
 
-    raise ValueError('Not found any expected char')
+_parameter_pattern = re.compile(r'([^;=]*)=([^;]*)|([^;]+)')
 
 
 def parse_vcard_property(line):
@@ -97,19 +227,16 @@ def parse_vcard_property(line):
         start = delimiter_index + 1
         delimiter_index = _index_any(line, ':', start)
         parameters_data = line[start:delimiter_index]
+        add_parameter = prop.add_parameter
 
-        for parameter_data in filter(None, parameters_data.split(';')):
-            pair = parameter_data.split('=', 1)
-
-            if len(pair) == 2:
-                parameter_name, parameter_value = pair
-            else:
-                parameter_name, parameter_value = 'type', pair[0]
+        for parameter_name, parameter_value, type_value in _parameter_pattern.findall(parameters_data):
+            if type_value:
+                parameter_name, parameter_value = 'type', type_value
 
             parameter_name = parameter_name.strip().lower()
             parameter_value = parameter_value.strip().lower()
 
-            prop.add_parameter(parameter_name, parameter_value)
+            add_parameter(parameter_name, parameter_value)
 
     prop.value = line[delimiter_index + 1:]
 
@@ -232,14 +359,18 @@ def read_vcard(reader):
     vcard.__line_span__ = LineSpan()
     vcard.__line_span__.start = prop.__line_span__.start
 
+    properties = vcard.properties
+    get_properties = properties.get
+
     while True:
-        version = vcard.properties.get('version', [_fallback_version])[0]
+        version = get_properties('version', [_fallback_version])[0]
         prop = read_vcard_property(reader, version)
-        property_name = prop.name
 
         if not prop:
             raise ValueError('incomplete vcard')
 
+        property_name = prop.name
+
         if property_name == 'end' or prop.value == 'vcard':
             vcard.__line_span__.end = prop.__line_span__.end
             break
@@ -250,14 +381,18 @@ def read_vcard(reader):
 
             continue
 
-        vcard.properties.setdefault(property_name, [])
-        same_name_properties = vcard.properties[property_name]
+        same_name_properties = properties.setdefault(property_name, [])
         same_name_properties.append(prop)
 
     return vcard
 
 
-_property_order = {
+class _PropertyOrder(dict):
+    def __missing__(self, property_name):
+        return 90
+
+
+_property_order = _PropertyOrder({
     'version': 0,
     'fn': 1,
     'n': 2,
@@ -285,39 +420,34 @@ _property_order = {
     'key': 24,
     'prodid': 98,
     'rev': 99,
-}
-
-
-def _property_sort_key(property_name):
-    return _property_order.get(property_name, 90)
+})
 
 
+@functools.lru_cache(maxsize=256)
 def _sorted_properties(names):
-    return sorted(names, key=_property_sort_key)
+    return tuple(sorted(names, key=_property_order.__getitem__))
 
 
 def write_vcard(stream, vcard):
-    stream.write('BEGIN:VCARD\n')
+    parts = ['BEGIN:VCARD\n']
 
-    for prop_name in _sorted_properties(vcard.properties):
+    for prop_name in _sorted_properties(tuple(vcard.properties)):
         same_name_properties = vcard.properties[prop_name]
+        upper_prop_name = prop_name.upper()
 
         for prop in same_name_properties:
-            stream.write(prop.name.upper())
+            parts.append(upper_prop_name)
 
             parameters = prop.parameters
 
             for parameter_name in sorted(parameters):
                 parameter_values = parameters[parameter_name]
+                upper_parameter_name = parameter_name.upper()
 
                 for parameter_value in sorted(parameter_values):
-                    stream.write(';')
-                    stream.write(parameter_name.upper())
-                    stream.write('=')
-                    stream.write(parameter_value.upper())
+                    parts.extend((';', upper_parameter_name, '=', parameter_value.upper()))
 
-            stream.write(':')
-            stream.write(prop.value)
-            stream.write('\n')
+            parts.extend((':', prop.value, '\n'))
 
-    stream.write('END:VCARD\n')
+    parts.append('END:VCARD\n')
+    stream.write(''.join(parts))
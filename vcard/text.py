@@ -1,7 +1,9 @@
+import functools
 import re
 import unicodedata
 
 
+@functools.lru_cache(maxsize=None)
 def _build_separation_pattern(separator):
     assert len(separator) == 1
 
@@ -30,109 +32,108 @@ def _split_structured_value(string, separation_pattern):
 
 
 def split_structured_value(string, separator):
+    if separator not in string:
+        return [string] if string else []
+
     return _split_structured_value(string, _build_separation_pattern(separator))
 
 
+_CRLF_RE = re.compile(r'\r\n?')
+
+_ESCAPE_TABLE = str.maketrans({
+    '\n': '\\n',
+    '\\': '\\\\',
+    ',': '\\,',
+    ';': '\\;',
+})
+
+
 def escape(string):
-    string = re.sub(r'(\r\n|\r)', '\n', string)
-    chars = []
-
-    for char in string:
-        if char == '\n':
-            chars.append('\\n')
-        elif char == '\\':
-            chars.append('\\\\')
-        elif char == ',':
-            chars.append('\\,')
-        elif char == ';':
-            chars.append('\\;')
-        else:
-            chars.append(char)
+    return _CRLF_RE.sub('\n', string).translate(_ESCAPE_TABLE)
 
-    return ''.join(chars)
 
+_UNESCAPE_RE = re.compile(r'\\(.)', re.DOTALL)
 
-def unescape(string):
-    chars = []
-    index = 0
-    end = len(string)
-
-    while index < end:
-        char = string[index]
-        index += 1
-
-        if char == '\\' and index < end:
-            next_char = string[index]
-            index += 1
-
-            if next_char in r'\,;':
-                chars.append(next_char)
-                continue
-            elif next_char in 'nN':
-                chars.append('\n')
-            else:
-                chars.append(char)
-                chars.append(next_char)
-        else:
-            chars.append(char)
+_UNESCAPE_MAP = {
+    '\\': '\\',
+    ',': ',',
+    ';': ';',
+    'n': '\n',
+    'N': '\n',
+}
+
+
+def _unescape_match(match, _map=_UNESCAPE_MAP):
+    return _map.get(match.group(1), match.group())
 
-    return ''.join(chars)
+
+def unescape(string):
+    return _UNESCAPE_RE.sub(_unescape_match, string)
 
 
 def fold(string, *, width=76, initial_newline=True, newline='\n'):
-    parts = []
-    start = 0
-    end = len(string)
+    step = width - 1
+    first = step if initial_newline else width
 
-    if initial_newline:
-        index = width - 1
-        part = newline + ' ' + string[start:index]
-    else:
-        index = width
-        part = string[start:index]
+    parts = [string[:first]]
+    parts += [string[index:index + step] for index in range(first, len(string), step)]
 
-    parts.append(part)
+    folded = (newline + ' ').join(parts)
 
-    start = index
-    index = start + (width - 1)
+    if initial_newline:
+        folded = newline + ' ' + folded
 
-    while index < end:
-        part = ' ' + string[start:index]
-        parts.append(part)
+    return folded
 
-        start = index
-        index = start + (width - 1)
 
-    return newline.join(parts)
+_WHITESPACES_RE = re.compile(r'[\f\v\t ]+')
+_NEWLINES_RE = re.compile(r'[\r\n]+')
+_ALL_WHITESPACES_RE = re.compile(r'\s+')
 
 
 def remove_redundant_whitespaces(string):
-    return re.sub(r'[\f\v\t ]+', ' ', string.strip())
+    return _WHITESPACES_RE.sub(' ', string.strip())
 
 
 def remove_newlines(string):
-    return re.sub(r'[\r\n]+', '', string)
+    return _NEWLINES_RE.sub('', string)
 
 
 def replace_newlines(string, newline='\n'):
-    return re.sub(r'[\r\n]+', newline, string)
+    return _NEWLINES_RE.sub(newline, string)
 
 
 def remove_whitespaces(string):
-    return re.sub(r'\s+', '', string)
+    return _ALL_WHITESPACES_RE.sub('', string)
 
 
 PUNCTUATION_CATEGORIES = {'Pc', 'Pd', 'Ps', 'Pe', 'Pi', 'Pf', 'Po'}
 
 
+class _PunctuationTable(dict):
+    def __init__(self, preserve_chars):
+        super().__init__()
+        self.preserve_chars = preserve_chars
+
+    def __missing__(self, code_point):
+        char = chr(code_point)
+
+        if char in self.preserve_chars or unicodedata.category(char) not in PUNCTUATION_CATEGORIES:
+            value = code_point
+        else:
+            value = None
+
+        self[code_point] = value
+        return value
+
+
+@functools.lru_cache(maxsize=32)
+def _build_punctuation_table(preserve_chars):
+    return _PunctuationTable(preserve_chars)
+
+
 def remove_punctuations(string, *, translate_table=None, preserve_chars='()[]{}@#$%-_+=.'):
     if translate_table:
         string = string.translate(translate_table)
 
-    chars = []
-
-    for char in string:
-        if char in preserve_chars or unicodedata.category(char) not in PUNCTUATION_CATEGORIES:
-            chars.append(char)
-
-    return ''.join(chars)
+    return string.translate(_build_punctuation_table(frozenset(preserve_chars)))
@@ -1,8 +1,9 @@
 import itertools
+import multiprocessing
 import quopri
 import logging
 
-from vcard.core import VCard, VCardProperty, TextReader, read_vcard, write_vcard
+from vcard.core import BUFFER_SIZE, VCard, VCardProperty, create_reader, read_vcard, write_vcard
 from vcard.text import split_structured_value, unescape, escape, remove_redundant_whitespaces, remove_newlines
 
 
@@ -31,9 +32,14 @@ def quoted_printable_decoder(prop_v21):
         return _dummy_decode
 
 
+def _clean(value):
+    return remove_newlines(remove_redundant_whitespaces(value))
+
+
 def convert_vcard_v21_to_v30(vcard_v21):
     vcard_v30 = VCard()
-    vcard_v30.add_property(VCardProperty('version', '3.0'))
+    add_property = vcard_v30.add_property
+    add_property(VCardProperty('version', '3.0'))
 
     for prop_v21 in itertools.chain.from_iterable(vcard_v21.properties.values()):
         prop_name = prop_v21.name
@@ -42,18 +48,19 @@ def convert_vcard_v21_to_v30(vcard_v21):
             continue
 
         prop_v30 = VCardProperty(prop_name)
+        add_parameter = prop_v30.add_parameter
 
         for param_name, param_values in prop_v21.parameters.items():
             if param_name == 'encoding':
                 if param_values[0] == 'base64':
-                    prop_v30.add_parameter('encoding', 'b')
+                    add_parameter('encoding', 'b')
                 else:
                     continue
             elif param_name == 'charset':
                 continue
             else:
                 for param_value in param_values:
-                    prop_v30.add_parameter(param_name, param_value)
+                    add_parameter(param_name, param_value)
 
         prop_v21_value = prop_v21.value.strip()
 
@@ -64,13 +71,11 @@ def convert_vcard_v21_to_v30(vcard_v21):
         decode = quoted_printable_decoder(prop_v21)
 
         if prop_name == 'n':
-            processors = [decode, unescape, remove_redundant_whitespaces, remove_newlines, escape]
             components = split_structured_value(prop_v21_value, ';')
             r = []
 
             for component in components[:2]:
-                for processor in processors:
-                    component = processor(component)
+                component = escape(_clean(unescape(decode(component))))
 
                 r.append(component)
 
@@ -78,8 +83,7 @@ def convert_vcard_v21_to_v30(vcard_v21):
                 parts = []
 
                 for part in split_structured_value(component, ','):
-                    for processor in processors:
-                        component = processor(part)
+                    part = escape(_clean(unescape(decode(part))))
 
                     if part:
                         parts.append(part)
@@ -91,41 +95,35 @@ def convert_vcard_v21_to_v30(vcard_v21):
 
             prop_v30_value = ';'.join(r)
         elif prop_name == 'adr':
-            processors = [decode, unescape, remove_redundant_whitespaces, remove_newlines, escape]
             components = split_structured_value(prop_v21_value, ';')
             r = []
 
             for component in components:
-                for processor in processors:
-                    component = processor(component)
+                component = escape(_clean(unescape(decode(component))))
 
                 r.append(component)
 
-            if len(components) < 7:
-                components += [''] * (7 - len(components))
+            if len(r) < 7:
+                r += [''] * (7 - len(r))
 
-            prop_v30_value = ';'.join(components)
+            prop_v30_value = ';'.join(r)
         elif prop_name == 'org':
-            processors = [decode, unescape, remove_redundant_whitespaces, remove_newlines, escape]
             components = split_structured_value(prop_v21_value, ';')
             r = []
 
             for component in components:
-                for processor in processors:
-                    component = processor(component)
+                component = escape(_clean(unescape(decode(component))))
 
                 if component:
                     r.append(component)
 
             prop_v30_value = ';'.join(r)
         elif prop_name == 'categories':
-            processors = [decode, unescape, remove_redundant_whitespaces, remove_newlines, escape]
             components = split_structured_value(prop_v21_value, ',')
             r = []
 
             for component in components:
-                for processor in processors:
-                    component = processor(component)
+                component = escape(_clean(unescape(decode(component))))
 
                 if component:
                     r.append(component)
@@ -134,24 +132,20 @@ def convert_vcard_v21_to_v30(vcard_v21):
         elif prop_name == 'geo':
             prop_v30_value = prop_v21_value
         else:
-            processors = [decode, unescape, remove_redundant_whitespaces, escape]
-            prop_v30_value = prop_v21_value
-
-            for processor in processors:
-                prop_v30_value = processor(prop_v30_value)
+            prop_v30_value = escape(remove_redundant_whitespaces(unescape(decode(prop_v21_value))))
 
         if not prop_v30_value:
             logger.error(f'empty {prop_name} property at {prop_v21.__line_span__}')
             continue
 
         prop_v30.value = prop_v30_value
-        vcard_v30.add_property(prop_v30)
+        add_property(prop_v30)
 
     return vcard_v30
 
 
 def convert_vcard_stream(input_stream, output_stream):
-    reader = TextReader(input_stream)
+    reader = create_reader(input_stream)
 
     while True:
         vcard_v21 = read_vcard(reader)
@@ -163,6 +157,38 @@ def convert_vcard_stream(input_stream, output_stream):
         write_vcard(output_stream, vcard_v30)
 
 
+def _convert_file(pair):
+    input_pathname, output_pathname = pair
+
+    try:
+        input_stream = open(input_pathname, 'rb', buffering=BUFFER_SIZE)
+    except OSError as exc:
+        logger.error(f'"{input_pathname}": {exc}')
+        return 1
+
+    with input_stream:
+        try:
+            output_stream = open(output_pathname, 'w', encoding='utf-8', buffering=BUFFER_SIZE)
+        except OSError as exc:
+            logger.error(f'"{output_pathname}": {exc}')
+            return 1
+
+        logger.info('converting "%s" to "%s"', input_pathname, output_pathname)
+
+        with output_stream:
+            try:
+                convert_vcard_stream(input_stream, output_stream)
+            except ValueError as exc:
+                logger.error(f'"{input_pathname}": {exc}')
+                return 1
+
+    return 0
+
+
+def _convert_files(pairs):
+    return sum(map(_convert_file, pairs))
+
+
 def main():
     import os
     import glob
@@ -201,36 +227,30 @@ def main():
 
         os.makedirs(args.output_path, exist_ok=True)
 
-    errors = 0
+    tasks = {}
 
     for input_pathname in input_files:
-        try:
-            input_stream = open(input_pathname, 'r', encoding='utf-8')
-        except OSError as exc:
-            logger.error(f'"{input_pathname}": {exc}')
-            errors += 1
-            continue
-
         if os.path.isdir(args.output_path):
             output_pathname = os.path.join(args.output_path, os.path.basename(input_pathname))
         else:
             output_pathname = args.output_path
 
-        try:
-            output_stream = open(output_pathname, 'w', encoding='utf-8')
-        except OSError as exc:
-            logger.error(f'"{output_pathname}": {exc}')
-            errors += 1
-            continue
+        tasks.setdefault(output_pathname, []).append((input_pathname, output_pathname))
 
-        logger.info('converting "%s" to "%s"', input_pathname, output_pathname)
+    for output_pathname, pairs in tasks.items():
+        if len(pairs) >= 2:
+            logger.warning(f'"{output_pathname}" is the output of {len(pairs)} input files, the last one converted wins.')
 
-        try:
-            convert_vcard_stream(input_stream, output_stream)
-        except ValueError as exc:
-            logger.error(f'"{input_pathname}": {exc}')
-            errors += 1
-            continue
+    tasks = list(tasks.values())
+
+    if len(tasks) < 2:
+        errors = sum(map(_convert_files, tasks))
+    else:
+        processes = min(len(tasks), os.cpu_count() or 1)
+        chunksize = max(1, len(tasks) // (4 * processes))
+
+        with multiprocessing.Pool(processes) as pool:
+            errors = sum(pool.imap_unordered(_convert_files, tasks, chunksize))
 
     sys.exit(errors)
 
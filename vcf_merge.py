@@ -1,7 +1,8 @@
 import itertools
 import logging
+import os
 
-from vcard.core import TextReader, read_vcard, write_vcard
+from vcard.core import BUFFER_SIZE, create_reader, prefetch_input_files, read_vcard, write_vcard
 from vcard.text import split_structured_value, unescape, escape, remove_redundant_whitespaces, remove_newlines
 
 
@@ -13,14 +14,9 @@ logger.setLevel(logging.DEBUG)
 logger.addHandler(_handler)
 
 
-def get_clean_name(vcard):
-    names = vcard.properties.get('n')
-
-    if not names:
-        return
-
+def _clean_name(value):
     processors = [unescape, remove_redundant_whitespaces, remove_newlines, escape]
-    components = split_structured_value(names[0].value, ';')[:2]
+    components = split_structured_value(value, ';')[:2]
     r = []
 
     for component in components[:2]:
@@ -32,30 +28,57 @@ def get_clean_name(vcard):
     return ''.join(r)
 
 
-def merge_vcard(states, vcard):
-    v = vcard.properties.get('version', [None])[0]
+def get_clean_name(vcard):
+    names = vcard.properties.get('n')
+
+    if not names:
+        return
+
+    return _clean_name(names[0].value)
+
+
+def get_merge_name(version, n_value, line_span=None):
+    if version == '2.1':
+        if line_span:
+            logger.error(f'merging vcard 2.1 objects is not supported, at {line_span}')
+
+        return
+
+    if n_value is None:
+        if line_span:
+            logger.error(f'no n property in vcard at {line_span}')
 
-    if v and v.value == '2.1':
-        logger.error(f'merging vcard 2.1 objects is not supported, at {vcard.__line_span__}')
         return
 
-    name = get_clean_name(vcard)
+    return _clean_name(n_value)
+
+
+class MergeState:
+    def __init__(self, vcard):
+        self.vcard = vcard
+        self.value_sets = {name: {prop.value for prop in props} for name, props in vcard.properties.items()}
+
+
+def merge_vcard(states, vcard):
+    v = vcard.properties.get('version', [None])[0]
+    names = vcard.properties.get('n')
+    name = get_merge_name(v.value if v else None, names[0].value if names else None, vcard.__line_span__)
 
     if name is None:
-        logger.error(f'no n property in vcard at {vcard.__line_span__}')
         return
 
     if name not in states:
-        states[name] = vcard
-        return
+        states[name] = MergeState(vcard)
+        return name
 
-    merged_vcard = states[name]
+    state = states[name]
+    merged_vcard = state.vcard
 
     for prop in itertools.chain.from_iterable(vcard.properties.values()):
         if prop.name in ('version', 'fn', 'n'):
             continue
 
-        old_values = set(map(lambda p: p.value, merged_vcard.properties[prop.name]))
+        old_values = state.value_sets.setdefault(prop.name, set())
 
         if prop.value in old_values:
             logger.info(f'found duplicated {prop.name} property at {prop.__line_span__}')
@@ -63,10 +86,86 @@ def merge_vcard(states, vcard):
             logger.info(f'merging {prop.name} property at {prop.__line_span__} to vcard at {merged_vcard.__line_span__}')
 
             merged_vcard.add_property(prop)
+            old_values.add(prop.value)
+
+    return name
+
+
+def count_vcard_stream(counts, input_stream):
+    reader = create_reader(input_stream)
+    in_vcard = False
+    version_seen = False
+    version = n_value = None
+    prop_name = None
+    fragments = []
+    lstrip_fragments = True
+
+    while True:
+        raw_line = reader.readline()
+        line = raw_line.rstrip('\r\n')
+
+        if line[:1] in ('\t', ' ') and prop_name is not None:
+            fragments.append(line.lstrip() if lstrip_fragments else line[1:])
+            continue
+
+        if prop_name is not None:
+            value = ''.join(fragments)
+
+            if not in_vcard:
+                if prop_name != 'begin' or value.lower() != 'vcard':
+                    return True
+
+                in_vcard = True
+                version_seen = False
+                version = n_value = None
+            else:
+                if prop_name in ('begin', 'end'):
+                    value = value.lower()
+
+                if prop_name == 'end' or value == 'vcard':
+                    merge_name = get_merge_name(version, n_value)
+
+                    if merge_name is not None:
+                        counts[merge_name] = counts.get(merge_name, 0) + 1
+
+                    in_vcard = False
+                elif prop_name == 'version':
+                    if version is None:
+                        version = value
+
+                    version_seen = True
+                elif prop_name == 'n':
+                    if n_value is None:
+                        n_value = value
+                elif prop_name == 'agent' and not version_seen:
+                    return False
+
+            prop_name = None
+
+        if not raw_line:
+            return True
+
+        if not line:
+            continue
+
+        head, colon, first_fragment = line.partition(':')
+
+        if not colon:
+            return True
+
+        group_and_name, _, parameters_data = head.partition(';')
+        parameters_data = parameters_data.lower()
+
+        if 'quoted-printable' in parameters_data or 'base64' in parameters_data:
+            return False
+
+        prop_name = group_and_name.split('.')[-1].lower()
+        fragments = [first_fragment]
+        lstrip_fragments = not (in_vcard and version_seen)
 
 
 def merge_vcard_stream(states, input_stream):
-    reader = TextReader(input_stream)
+    reader = create_reader(input_stream)
 
     while True:
         vcard = read_vcard(reader)
@@ -77,8 +176,38 @@ def merge_vcard_stream(states, input_stream):
         merge_vcard(states, vcard)
 
 
+def merge_and_write_vcard_stream(states, input_stream, pending, output_stream):
+    reader = create_reader(input_stream)
+
+    while True:
+        vcard = read_vcard(reader)
+
+        if not vcard:
+            break
+
+        name = merge_vcard(states, vcard)
+
+        if name not in pending:
+            continue
+
+        pending[name] -= 1
+
+        if pending[name] <= 0:
+            del pending[name]
+            write_vcard(output_stream, states.pop(name).vcard)
+
+
+_streaming_merge_size = 256 << 20
+
+
+def _file_size(pathname):
+    try:
+        return os.path.getsize(pathname)
+    except OSError:
+        return 0
+
+
 def main():
-    import os
     import glob
     import sys
     import argparse
@@ -113,17 +242,30 @@ def main():
         parser.exit(-1, 'output path must be a file.')
 
     try:
-        output_stream = open(args.output_path, 'w', encoding='utf-8')
+        output_stream = open(args.output_path, 'w', encoding='utf-8', buffering=BUFFER_SIZE)
     except OSError as exc:
         parser.exit(-1, f'"{args.output_path}": {exc}')
 
+    pending = None
+
+    if sum(_file_size(pathname) for pathname in input_files) > _streaming_merge_size:
+        pending = {}
+
+        for input_pathname, input_data, exc in prefetch_input_files(input_files):
+            if exc or pending is None:
+                continue
+
+            try:
+                if not count_vcard_stream(pending, input_data):
+                    pending = None
+            except ValueError:
+                continue
+
     errors = 0
     states = {}
 
-    for input_pathname in input_files:
-        try:
-            input_stream = open(input_pathname, 'r', encoding='utf-8')
-        except OSError as exc:
+    for input_pathname, input_data, exc in prefetch_input_files(input_files):
+        if exc:
             logger.error(f'"{input_pathname}": {exc}')
             errors += 1
             continue
@@ -131,14 +273,17 @@ def main():
         logger.info('merging "%s"', input_pathname)
 
         try:
-            merge_vcard_stream(states, input_stream)
+            if pending is None:
+                merge_vcard_stream(states, input_data)
+            else:
+                merge_and_write_vcard_stream(states, input_data, pending, output_stream)
         except ValueError as exc:
             logger.error(f'"{input_pathname}": {exc}')
             errors += 1
             continue
 
-    for vcard in states.values():
-        write_vcard(output_stream, vcard)
+    for state in states.values():
+        write_vcard(output_stream, state.vcard)
 
     sys.exit(errors)
 